@@ -1,18 +1,18 @@
-import json
 import os
-
-PROJECTS_FILE = ".devbot_projects.json"
+from projects_store import load, save
 
 # Load existing projects
-if os.path.exists(PROJECTS_FILE):
-    with open(PROJECTS_FILE) as f:
-        data = json.load(f)
-else:
-    data = {"projects": {}, "default": None}
+data = load()
 
 # Ask user for project name and path
 name = input("Enter the new project name: ").strip()
 path = input("Enter the full path to the project folder: ").strip()
+path = os.path.expandvars(os.path.expanduser(path))  # accept ~/... and $HOME/... like the bot does
+
+# Catch typos now rather than when the bot first opens the repo
+if not os.path.isdir(path):
+    print(f"❌ '{path}' is not an existing directory. Project not added.")
+    raise SystemExit(1)
 
 # Add to projects
 data["projects"][name] = path
@@ -23,7 +23,6 @@ if set_default == "y":
     data["default"] = name
 
 # Save JSON
-with open(PROJECTS_FILE, "w") as f:
-    json.dump(data, f, indent=2)
+save(data)
 
 print(f"✅ Project '{name}' added successfully!")
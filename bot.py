@@ -1,33 +1,44 @@
-import git, os, json, re, requests
+import os, json, re, mmap, socket, threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from datetime import datetime, time
-from InquirerPy import inquirer
+from time import localtime, monotonic, time as wall_time
 from rich.console import Console
 from rich.table import Table
 from rich.syntax import Syntax
+from json_store import load_json_cached, save_json_cached, invalidate
+from projects_store import load as load_projects
+
+# git and InquirerPy are slow to import; they are pulled in by the functions that use them
 
 # ===== Global Config =====
-console = Console()
+console = Console(highlight=False)  # markup only; skip the auto-highlight regex pass
 QUEUE_FILE = ".devbot_queue.json"
-PROJECTS_FILE = ".devbot_projects.json"
 WORK_START, WORK_END = 8, 21  # 8AM–9PM
+DIFF_THEME = Syntax.get_theme("monokai")  # resolve the pygments theme once
+ONLINE_TTL = 30  # seconds a connectivity probe result stays valid
+FETCH_TTL = 60  # skip `git fetch` if FETCH_HEAD is younger than this (seconds)
+TODO_KEYWORDS = ("TODO", "WIP")
+# Single compiled alternation; add markers to TODO_KEYWORDS rather than scanning once per keyword
+TODO_RE = re.compile(b"(?i)" + b"|".join(re.escape(kw.encode()) for kw in TODO_KEYWORDS))
+MMAP_MIN_SIZE = 1 << 20  # files below 1 MiB are read(); mmap only pays off (and risks SIGBUS) on big ones
+SCAN_EXTS = frozenset({".py", ".js", ".java", ".txt"})
+SCAN_SKIP = frozenset({
+    ".git", "node_modules", "__pycache__", ".venv", "venv", "dist", "build",
+    ".mypy_cache", ".pytest_cache", "target",
+})
 
-# ===== Helper Functions =====
-def load_projects():
-    if os.path.exists(PROJECTS_FILE):
-        with open(PROJECTS_FILE, "r") as f:
-            return json.load(f)
-    return {"projects": {}, "default": None}
-
-def save_projects(projects):
-    with open(PROJECTS_FILE, "w") as f:
-        json.dump(projects, f, indent=2)
+_ONLINE_CACHE = {"ts": 0.0, "val": None, "probing": False}
+_ONLINE_READY = threading.Event()  # set once the first probe has finished
 
+# ===== Helper Functions =====
 def choose_project():
     projects_data = load_projects()
     projects = projects_data["projects"]
     if not projects:
         console.print("[red]No registered projects found.[/red]")
         return None
+    from InquirerPy import inquirer
     project_name = inquirer.fuzzy(
         message="Select a project to work on:",
         choices=list(projects.keys())
@@ -35,22 +46,44 @@ def choose_project():
     return projects[project_name]
 
 def detect_repo(folder):
+    import git
     try:
         return git.Repo(folder)
     except git.exc.InvalidGitRepositoryError:
         return None
 
 def init_repo(folder):
+    import git
     repo = git.Repo.init(folder)
     console.print(f"[green]Initialized new Git repo in {folder}[/green]")
     return repo
 
-def is_online(remote_url="https://github.com"):
+def _refresh_online(host="github.com"):
+    # A bare TCP connect proves reachability without a TLS handshake
     try:
-        requests.head(remote_url, timeout=3)
-        return True
-    except requests.RequestException:
-        return False
+        socket.create_connection((host, 443), timeout=2).close()
+        val = True
+    except OSError:
+        val = False
+    _ONLINE_CACHE.update(ts=monotonic(), val=val, probing=False)
+    _ONLINE_READY.set()
+    return val
+
+def start_online_probe():
+    _ONLINE_CACHE["probing"] = True
+    threading.Thread(target=_refresh_online, daemon=True).start()
+
+def is_online():
+    if _ONLINE_CACHE["val"] is None and _ONLINE_CACHE["probing"]:
+        _ONLINE_READY.wait(timeout=3)  # reuse the background probe instead of racing it
+    if _ONLINE_CACHE["val"] is not None and monotonic() - _ONLINE_CACHE["ts"] < ONLINE_TTL:
+        return _ONLINE_CACHE["val"]
+    return _refresh_online()
+
+def _ts():
+    # Hand-formatted "%Y-%m-%d %H:%M:%S"; avoids strftime's format parsing
+    t = localtime()
+    return f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d} {t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}"
 
 def check_work_time():
     now = datetime.now().time()
@@ -60,46 +93,137 @@ def check_work_time():
     return False
 
 # ===== Git & Queue Functions =====
+# The queue is newline-delimited JSON so enqueueing is a single append
+def _parse_queue(data):
+    if data.lstrip().startswith(b"["):
+        return json.loads(data)  # queue file written by an older version
+    lines = data.split(b"\n")
+    tail = lines.pop()  # b"" unless the last append was cut short
+    queue = []
+    # A crash mid-append leaves a torn line (later appends start after it on a
+    # fresh line); skip such entries rather than fail to load the whole queue
+    torn = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            queue.append(json.loads(line))
+        except ValueError:
+            torn += 1
+    if tail.strip():
+        torn += 1  # no trailing newline: the append never finished
+    if torn:
+        console.print(f"[red]Skipping {torn} incomplete queue entr{'y' if torn == 1 else 'ies'} in {QUEUE_FILE}[/red]")
+    return queue
+
 def load_queue():
-    if os.path.exists(QUEUE_FILE):
-        with open(QUEUE_FILE, "r") as f:
-            return json.load(f)
-    return []
+    return load_json_cached(QUEUE_FILE, [], parse=_parse_queue)
 
 def save_queue(queue):
-    with open(QUEUE_FILE, "w") as f:
-        json.dump(queue, f, indent=2)
+    buf = "".join(json.dumps(item) + "\n" for item in queue).encode()
+    save_json_cached(QUEUE_FILE, queue, buf)
 
-def queue_commit(commit_msg, files):
-    queue = load_queue()
-    queue.append({
+def append_queue(item):
+    legacy = torn = False
+    try:
+        with open(QUEUE_FILE, "rb") as f:
+            legacy = f.read(1) == b"["
+            if f.seek(0, os.SEEK_END):
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b"\n"
+    except OSError:
+        pass
+    if legacy:
+        save_queue(load_queue() + [item])  # rewrite once as NDJSON
+        return
+    line = (json.dumps(item) + "\n").encode()
+    with open(QUEUE_FILE, "ab") as f:
+        # Start on a fresh line if a previous append was torn, so this entry survives
+        f.write(b"\n" + line if torn else line)
+        f.flush()
+        os.fsync(f.fileno())
+    invalidate(QUEUE_FILE)
+
+def queue_commit(commit_msg, files, committed=False):
+    item = {
         "message": commit_msg,
         "files": files,
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    })
-    save_queue(queue)
+        "timestamp": _ts()
+    }
+    if committed:
+        item["committed"] = True  # already a local commit; only needs pushing
+    append_queue(item)
     console.print(f"[yellow]⏳ Commit queued (offline):[/yellow] {commit_msg}")
 
 def push_queue(repo):
-    queue = load_queue()
+    queue = list(load_queue())
     if not queue or not is_online():
         return
     origin = repo.remote(name="origin")
-    for item in queue:
-        repo.index.add(item["files"])
-        repo.index.commit(item["message"])
+    # Commit each item locally (cheap), then push them all in one round-trip.
+    # Items stay queued, marked "committed", until the push succeeds so a retry only pushes.
+    for i, item in enumerate(queue):
+        if item.get("committed"):
+            continue
+        try:
+            repo.index.add(item["files"])
+            repo.index.commit(item["message"])
+        except Exception:
+            save_queue(queue)  # checkpoint so a retry resumes here
+            console.print(f"[red]Failed to commit queued item:[/red] {item['message']}")
+            return
+        queue[i] = {**item, "committed": True}
+    save_queue(queue)
+    try:
         origin.push()
-        console.print(f"[cyan]{item['timestamp']} - Pushed queued commit:[/cyan] {item['message']}")
+    except Exception:
+        console.print("[yellow]Queued commits were made locally but could not be pushed; will retry next run.[/yellow]")
+        return
     save_queue([])
+    for item in queue:
+        console.print(f"[cyan]{item['timestamp']} - Pushed queued commit:[/cyan] {item['message']}")
 
 def list_unstaged_files(repo):
     return [item.a_path for item in repo.index.diff(None)]
 
+def _unquote_path(path):
+    # Undo git's C-style quoting ("a\tb", "caf\303\251.py") of a path
+    if not (len(path) >= 2 and path[0] == path[-1] == '"'):
+        return path
+    escapes = {b"a": b"\a", b"b": b"\b", b"t": b"\t", b"n": b"\n", b"v": b"\v", b"f": b"\f", b"r": b"\r"}
+    raw = re.sub(
+        rb"\\([0-7]{3}|.)",
+        lambda m: bytes([int(m[1], 8)]) if len(m[1]) == 3 else escapes.get(m[1], m[1]),
+        path[1:-1].encode(),
+    )
+    return raw.decode("utf-8", "replace")
+
+def _diff_header_path(header):
+    # Destination path from "a/<path> b/<path>" (either side may be C-quoted)
+    if header.endswith('"'):
+        return _unquote_path(header[header.rfind(' "b/') + 1:])[2:]
+    if not header.startswith('"'):
+        half = (len(header) - 5) // 2
+        if header[2:2 + half] == header[5 + half:]:
+            return header[5 + half:]  # unrenamed path; safe even if it contains " b/"
+    return header.rsplit(" b/", 1)[-1]
+
 def show_diff(repo, files):
+    # One `git diff` for every file, split back into per-file chunks. The output
+    # format is pinned so user config (prefixes, colour, quoting) can't change the headers.
+    out = repo.git(c="core.quotePath=false").diff(
+        "--no-color", "--no-ext-diff", "--src-prefix=a/", "--dst-prefix=b/", "--", *files
+    )
+    diffs = {}
+    for chunk in re.split(r'(?m)^diff --git ', out)[1:]:
+        path = _diff_header_path(chunk.split("\n", 1)[0])
+        diffs[path] = "diff --git " + chunk.rstrip("\n")
     for file in files:
-        diff = repo.git.diff(file)
+        diff = diffs.get(file)
+        if diff is None:
+            diff = repo.git.diff(file)  # no matching chunk; fall back to a per-file diff
         if diff:
-            syntax = Syntax(diff, "diff", theme="monokai", line_numbers=True)
+            syntax = Syntax(diff, "diff", theme=DIFF_THEME, line_numbers=True)
             console.print(syntax)
         else:
             console.print(f"[yellow]{file} has no changes[/yellow]")
@@ -110,52 +234,124 @@ def commit_and_push(repo, commit_msg, files):
         repo.index.commit(commit_msg)
         try:
             repo.remote(name='origin').push()
-            console.print(f"[green]{datetime.now().strftime('%H:%M:%S')} - Committed & pushed:[/green] {commit_msg}")
+            console.print(f"[green]{_ts()[11:]} - Committed & pushed:[/green] {commit_msg}")
         except:
             console.print("[yellow]Could not push to remote. Queuing commit.[/yellow]")
-            queue_commit(commit_msg, files)
+            queue_commit(commit_msg, files, committed=True)
     else:
         queue_commit(commit_msg, files)
 
 # ===== TODO/WIP Scanning =====
+def scan_file(file_path):
+    try:
+        with open(file_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < MMAP_MIN_SIZE:
+                data = f.read()
+            else:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return []
+    file = os.path.basename(file_path)
+    hits = []
+    line_no, counted, pos = 1, 0, 0
+    try:
+        while (m := TODO_RE.search(data, pos)):
+            start = data.rfind(b"\n", 0, m.start()) + 1
+            end = data.find(b"\n", m.end())
+            if end == -1:
+                end = len(data)
+            # Each byte is newline-counted once: only the gap since the previous hit line
+            line_no += data[counted:start].count(b"\n")
+            counted = start
+            hits.append(f"{file}:{line_no} - {data[start:end].decode('utf-8', 'replace').strip()}")
+            pos = end + 1  # resume on the next line; one entry per line
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+    return hits
+
+def walk_source_files(path):
+    # scandir entries carry their file type, so no extra stat per entry
+    stack = [path]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in SCAN_SKIP and not entry.name.startswith("."):
+                            stack.append(entry.path)
+                    elif entry.name[entry.name.rfind("."):] in SCAN_EXTS:
+                        yield entry.path
+        except OSError:
+            continue
+
 def scan_todos(path="."):
-    todos = []
-    for root, _, files in os.walk(path):
-        for file in files:
-            if file.endswith(('.py', '.js', '.java', '.txt')):
-                try:
-                    with open(os.path.join(root, file)) as f:
-                        for i, line in enumerate(f):
-                            if re.search(r'TODO|WIP', line, re.IGNORECASE):
-                                todos.append(f"{file}:{i+1} - {line.strip()}")
-                except:
-                    continue
-    return todos
+    paths = list(walk_source_files(path))
+    # open()/read() block on the disk, so a thread pool overlaps the I/O
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as ex:
+        return list(chain.from_iterable(ex.map(scan_file, paths)))
 
 # ===== Queue & Status Reporting =====
+def _queue_table():
+    table = Table(title="Queued Commits (Offline)")
+    table.add_column("Time")
+    table.add_column("Message")
+    table.add_column("Files")
+    return table
+
 def show_queue():
     queue = load_queue()
     if queue:
-        table = Table(title="Queued Commits (Offline)")
-        table.add_column("Time")
-        table.add_column("Message")
-        table.add_column("Files")
+        table = _queue_table()
         for item in queue:
             table.add_row(item["timestamp"], item["message"], ", ".join(item["files"]))
         console.print(table)
     else:
         console.print("[green]No queued commits[/green]")
 
+def parse_status(out):
+    # `git status --porcelain=v2 --branch -z`: NUL-separated "# branch.ab +A -B"
+    # header, then "1 XY ..." / "2 XY ..." entries where Y != "." means a worktree
+    # change. Rename ("2") entries are followed by their original path as an extra
+    # field. behind is None when the branch has no upstream.
+    behind = None
+    unstaged = []
+    fields = iter(out.split("\0"))
+    for rec in fields:
+        if rec.startswith("# branch.ab "):
+            behind = -int(rec.split()[3])
+        elif rec.startswith("1 "):
+            if rec[3] != ".":
+                unstaged.append(rec.split(" ", 8)[8])
+        elif rec.startswith("2 "):
+            next(fields, None)  # original path of the rename
+            if rec[3] != ".":
+                unstaged.append(rec.split(" ", 9)[9])
+    return behind, unstaged
+
 def check_push_status(repo):
     origin = repo.remote(name="origin")
     try:
-        repo.git.fetch()
+        st = os.stat(os.path.join(repo.git_dir, "FETCH_HEAD"))
+        # A failed fetch leaves an empty FETCH_HEAD with a fresh mtime; only trust a non-empty one
+        fetched_recently = st.st_size > 0 and wall_time() - st.st_mtime <= FETCH_TTL
+    except OSError:
+        fetched_recently = False
+    try:
+        if not fetched_recently:
+            repo.git.fetch()
     except:
         console.print("[red]Failed to fetch remote. Check network or remote URL[/red]")
         return
-    unpushed = list(repo.iter_commits(f'{repo.active_branch}..origin/{repo.active_branch}'))
+    # One status call yields both the worktree changes and the upstream counters
+    # --untracked-files=no: untracked paths are never reported, so don't walk for them
+    behind, staged = parse_status(repo.git.status('--porcelain=v2', '--branch', '-z', '--untracked-files=no'))
+    unpushed = []
+    # Without an upstream there are no counters, so always ask rev-list
+    if behind is None or behind:
+        branch = repo.active_branch
+        unpushed = repo.git.rev_list('--abbrev-commit', '--abbrev=7', f'{branch}..origin/{branch}').split()
     queued = load_queue()
-    staged = [item.a_path for item in repo.index.diff(None)]
     
     if not unpushed and not queued and not staged:
         console.print("[green]✅ All changes fully pushed to remote![/green]")
@@ -163,13 +359,17 @@ def check_push_status(repo):
         if staged:
             console.print(f"[yellow]⚠ Staged but not committed: {staged}[/yellow]")
         if unpushed:
-            console.print(f"[yellow]⚠ Commits not pushed: {[c.hexsha[:7] for c in unpushed]}[/yellow]")
+            console.print(f"[yellow]⚠ Commits not pushed: {unpushed}[/yellow]")
         if queued:
             console.print(f"[yellow]⏳ Queued commits (offline): {[q['message'] for q in queued]}[/yellow]")
 
 # ===== Main Flow =====
 def main():
+    from InquirerPy import inquirer
     console.print("[blue]--- Developer Assistant Bot ---[/blue]")
+    os.environ.setdefault("GIT_OPTIONAL_LOCKS", "0")  # don't take index.lock on read-only git calls
+    # Probe connectivity in the background while the user picks a project
+    start_online_probe()
     if not check_work_time():
         console.print("[blue]Proceeding anyway...[/blue]")
 
@@ -218,7 +418,7 @@ def main():
 
     # Final status
     check_push_status(repo)
-    console.print(f"[blue]{datetime.now().strftime('%H:%M:%S')} - Project inspection completed[/blue]")
+    console.print(f"[blue]{_ts()[11:]} - Project inspection completed[/blue]")
 
 # ===== Run Bot =====
 if __name__ == "__main__":
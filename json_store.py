@@ -0,0 +1,53 @@
+import os, json, stat, tempfile
+
+# mtime-cached JSON loading and atomic saving, shared by the projects and queue files
+
+_CACHE = {}  # path -> (st_mtime_ns, parsed data)
+# Reused encoder: json.dumps() builds a fresh JSONEncoder whenever non-default options are passed
+_PRETTY_JSON = json.JSONEncoder(indent=2)
+
+# ===== Cached JSON Files =====
+def load_json_cached(path, default, parse=json.loads):
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return default
+    cached = _CACHE.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, "rb") as f:
+        data = parse(f.read())
+    _CACHE[path] = (mtime, data)
+    return data
+
+def _target_mode(path):
+    # Keep an existing file's permissions; new files get what open(path, "w") would give
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+def save_json_cached(path, data, buf=None):
+    if buf is None:
+        buf = _PRETTY_JSON.encode(data).encode()
+    # Write to a unique temp file and rename over the target so readers never see a partial file
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(buf)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, _target_mode(path))  # mkstemp creates 0600
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    _CACHE[path] = (os.stat(path).st_mtime_ns, data)
+
+def invalidate(path):
+    _CACHE.pop(path, None)
@@ -0,0 +1,11 @@
+from json_store import load_json_cached, save_json_cached
+
+# Shared by bot.py and add_project.py so both read/write the projects file the same way
+PROJECTS_FILE = ".devbot_projects.json"
+
+# ===== Projects File =====
+def load():
+    return load_json_cached(PROJECTS_FILE, {"projects": {}, "default": None})
+
+def save(projects):
+    save_json_cached(PROJECTS_FILE, projects)